@@ -1,10 +1,13 @@
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, redirect, url_for, Response, stream_with_context
 import os
+import sys
 import json
+import shutil
 from werkzeug.utils import secure_filename
+from flask_compress import Compress
 from audio_splitter import AudioSplitter
+from tasks import split_task, get_job, save_job, clear_jobs
 import zipfile
-import tempfile
 from datetime import datetime
 
 app = Flask(__name__)
@@ -12,15 +15,70 @@ app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
 app.config['UPLOAD_FOLDER'] = 'input'
 app.config['OUTPUT_FOLDER'] = 'output'
 
+# Compress JSON and HTML responses
+Compress(app)
+
 # Initialize audio splitter
 splitter = AudioSplitter()
 
-# Store processing status
-processing_status = {}
-
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'wav'
 
+def is_wav_stream(stream):
+    # RIFF....WAVE magic bytes, checked without consuming the stream
+    head = stream.read(12)
+    stream.seek(0)
+    return head[:4] == b'RIFF' and head[8:12] == b'WAVE'
+
+class ZipStreamBuffer:
+    """
+    Write-only file object that collects zipfile output until it is drained
+    """
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_zip(file_paths, chunk_size=1024 * 1024):
+    """
+    Yield a zip of (path, arcname) pairs piece by piece
+    """
+    buffer = ZipStreamBuffer()
+    # Fastest deflate level: PCM still shrinks noticeably and the network dominates
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+        for file_path, arcname in file_paths:
+            if not os.path.exists(file_path):
+                continue
+            # Keep the file's mtime and permissions; open() with a ZipInfo
+            # ignores the archive's compresslevel, so set it on the entry
+            zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            if sys.version_info >= (3, 13):
+                zinfo.compress_level = 1
+            else:
+                # Before 3.13 the per-entry level only exists as a private
+                # attribute; set it deliberately, as ZipFile.write() does
+                zinfo._compresslevel = 1
+            with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dest:
+                while True:
+                    data = src.read(chunk_size)
+                    if not data:
+                        break
+                    dest.write(data)
+                    yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -38,13 +96,16 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Only WAV files are allowed'}), 400
         
+        if not is_wav_stream(file.stream):
+            return jsonify({'error': 'Not a WAV file'}), 400
+        
         # Get parameters
         max_duration = float(request.form.get('max_duration', 60))
         min_silence_len = int(request.form.get('min_silence_len', 1000))
         silence_thresh = int(request.form.get('silence_thresh', -40))
         
         # Validate parameters
-        if max_duration <= 0 or max_duration > 3600:  # Max 1 hour per segment
+        if max_duration < 1 or max_duration > 3600:  # Max 1 hour per segment
             return jsonify({'error': 'Duration must be between 1 and 3600 seconds'}), 400
         
         if min_silence_len < 100 or min_silence_len > 5000:
@@ -53,6 +114,13 @@ def upload_file():
         if silence_thresh < -80 or silence_thresh > 0:
             return jsonify({'error': 'Silence threshold must be between -80 and 0 dB'}), 400
         
+        # Get audio info from the header before anything touches disk
+        try:
+            audio_info = splitter.get_audio_info(file.stream)
+        except Exception as e:
+            return jsonify({'error': f'Invalid audio file: {str(e)}'}), 400
+        file.stream.seek(0)
+        
         # Save uploaded file
         filename = secure_filename(file.filename)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -60,16 +128,9 @@ def upload_file():
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
-        # Get audio info
-        try:
-            audio_info = splitter.get_audio_info(filepath)
-        except Exception as e:
-            os.remove(filepath)  # Clean up
-            return jsonify({'error': f'Invalid audio file: {str(e)}'}), 400
-        
         # Store processing job
         job_id = f"{timestamp}_{secure_filename(file.filename.rsplit('.', 1)[0])}"
-        processing_status[job_id] = {
+        save_job(job_id, {
             'status': 'uploaded',
             'filename': filename,
             'filepath': filepath,
@@ -81,7 +142,7 @@ def upload_file():
             },
             'output_files': [],
             'error': None
-        }
+        })
         
         return jsonify({
             'job_id': job_id,
@@ -95,51 +156,29 @@ def upload_file():
 @app.route('/process/<job_id>', methods=['POST'])
 def process_audio(job_id):
     try:
-        if job_id not in processing_status:
+        job = get_job(job_id)
+        if job is None:
             return jsonify({'error': 'Job not found'}), 404
         
-        job = processing_status[job_id]
         if job['status'] != 'uploaded':
             return jsonify({'error': 'Job already processed or in progress'}), 400
         
-        # Update status
-        job['status'] = 'processing'
+        # Hand the job to a worker; progress is reported through /status
+        job['status'] = 'queued'
+        save_job(job_id, job)
+        split_task.delay(job_id)
         
-        # Clear output folder before processing
-        splitter.clear_output_folder()
-        
-        # Process the audio file
-        try:
-            output_files = splitter.detect_silence_and_split(
-                job['filepath'],
-                job['parameters']['max_duration'],
-                job['parameters']['min_silence_len'],
-                job['parameters']['silence_thresh']
-            )
-            
-            job['output_files'] = [os.path.basename(f) for f in output_files]
-            job['status'] = 'completed'
-            
-            return jsonify({
-                'status': 'completed',
-                'output_files': job['output_files'],
-                'total_segments': len(output_files)
-            })
-            
-        except Exception as e:
-            job['status'] = 'error'
-            job['error'] = str(e)
-            return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+        return jsonify({'status': 'queued'})
         
     except Exception as e:
         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
 
 @app.route('/status/<job_id>')
 def get_status(job_id):
-    if job_id not in processing_status:
+    job = get_job(job_id)
+    if job is None:
         return jsonify({'error': 'Job not found'}), 404
     
-    job = processing_status[job_id]
     return jsonify({
         'status': job['status'],
         'output_files': job.get('output_files', []),
@@ -147,12 +186,23 @@ def get_status(job_id):
         'audio_info': job.get('audio_info')
     })
 
-@app.route('/download/<filename>')
-def download_file(filename):
+@app.route('/download/<job_id>/<filename>')
+def download_file(job_id, filename):
     try:
-        return send_file(
-            os.path.join(app.config['OUTPUT_FOLDER'], filename),
-            as_attachment=True
+        # Only serve files the job actually produced, never a path built from the URL
+        job = get_job(job_id)
+        if job is None or filename not in job.get('output_files', []):
+            return jsonify({'error': 'File not found'}), 404
+        
+        # Conditional GET lets browsers revalidate a re-download with a 304
+        job_folder = splitter.get_job_output_folder(job_id)
+        return send_from_directory(
+            job_folder,
+            filename,
+            as_attachment=True,
+            conditional=True,
+            etag=True,
+            last_modified=os.path.getmtime(os.path.join(job_folder, filename))
         )
     except Exception as e:
         return jsonify({'error': f'File not found: {str(e)}'}), 404
@@ -160,27 +210,23 @@ def download_file(filename):
 @app.route('/download_all/<job_id>')
 def download_all(job_id):
     try:
-        if job_id not in processing_status:
+        job = get_job(job_id)
+        if job is None:
             return jsonify({'error': 'Job not found'}), 404
         
-        job = processing_status[job_id]
         if job['status'] != 'completed':
             return jsonify({'error': 'Job not completed'}), 400
         
-        # Create a temporary zip file
-        temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-        
-        with zipfile.ZipFile(temp_zip.name, 'w') as zipf:
-            for filename in job['output_files']:
-                file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-                if os.path.exists(file_path):
-                    zipf.write(file_path, filename)
+        # Build the zip on the fly so nothing is staged on disk
+        file_paths = [
+            (os.path.join(splitter.get_job_output_folder(job_id), filename), filename)
+            for filename in job['output_files']
+        ]
         
-        return send_file(
-            temp_zip.name,
-            as_attachment=True,
-            download_name=f"{job_id}_split_audio.zip",
-            mimetype='application/zip'
+        return Response(
+            stream_with_context(stream_zip(file_paths)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename={job_id}_split_audio.zip'}
         )
         
     except Exception as e:
@@ -193,13 +239,11 @@ def clear_files():
         splitter.clear_output_folder()
         
         # Clear input folder
-        for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
+        shutil.rmtree(app.config['UPLOAD_FOLDER'], ignore_errors=True)
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
         
         # Clear processing status
-        processing_status.clear()
+        clear_jobs()
         
         return jsonify({'message': 'All files cleared successfully'})
         
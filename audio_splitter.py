@@ -1,7 +1,73 @@
 import os
+import shutil
+import wave
 from pydub import AudioSegment
 from pydub.silence import split_on_silence
-import math
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Chunk writes are disk-bound and each Celery worker process runs its own
+# pool, so a few threads are enough; override with WAVSLICER_EXPORT_WORKERS
+EXPORT_WORKERS = int(os.environ.get('WAVSLICER_EXPORT_WORKERS', 4))
+
+# Bytes per sample of the soundfile subtypes a WAV can hold
+SUBTYPE_SAMPLE_WIDTHS = {
+    'PCM_U8': 1, 'PCM_S8': 1, 'PCM_16': 2, 'PCM_24': 3, 'PCM_32': 4,
+    'FLOAT': 4, 'DOUBLE': 8,
+}
+
+# Approximate sample rate the silence scan decimates to
+SCAN_RATE = 8000
+
+# Windows handled by one parallel lane; each lane pays for one full window sum
+SCAN_TILE_WINDOWS = 256
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _scan_silence(frame_sq, starts, window, thresh_frame_sq):
+        """
+        Flag every window-frame window beginning at each of starts (which
+        must be increasing) whose mean per-frame energy is below
+        thresh_frame_sq
+        
+        Tiles of windows run in parallel; within a tile the energy sum
+        slides to the next start (drop the frames that left, add the ones
+        that entered) instead of re-summing the whole window.
+        """
+        n = len(starts)
+        out = np.empty(n, np.bool_)
+        thresh_sum = thresh_frame_sq * window
+        n_tiles = (n + SCAN_TILE_WINDOWS - 1) // SCAN_TILE_WINDOWS
+        for t in prange(n_tiles):
+            first = t * SCAN_TILE_WINDOWS
+            last = min(first + SCAN_TILE_WINDOWS, n)
+            acc = np.int64(0)
+            for i in range(first, last):
+                s = starts[i]
+                if i == first or s - starts[i - 1] > window:
+                    acc = np.int64(0)
+                    for j in range(s, s + window):
+                        acc += np.int64(frame_sq[j])
+                else:
+                    prev = starts[i - 1]
+                    for j in range(prev, s):
+                        acc -= np.int64(frame_sq[j])
+                    for j in range(prev + window, s + window):
+                        acc += np.int64(frame_sq[j])
+                out[i] = acc < thresh_sum
+        return out
+else:
+    _scan_silence = None
 
 class AudioSplitter:
     def __init__(self, input_folder="input", output_folder="output"):
@@ -13,7 +79,7 @@ class AudioSplitter:
         os.makedirs(self.output_folder, exist_ok=True)
     
     def detect_silence_and_split(self, audio_file_path, max_duration_seconds=60, 
-                                min_silence_len=1000, silence_thresh=-40):
+                                min_silence_len=1000, silence_thresh=-40, output_folder=None):
         """
         Split audio file based on silence detection with duration limits
         
@@ -22,6 +88,7 @@ class AudioSplitter:
             max_duration_seconds: Maximum duration for each split (in seconds)
             min_silence_len: Minimum length of silence to be considered a split point (ms)
             silence_thresh: Silence threshold in dB
+            output_folder: Folder to write the splits to (defaults to the output folder)
         
         Returns:
             List of output file paths
@@ -31,40 +98,49 @@ class AudioSplitter:
             if not os.path.exists(audio_file_path):
                 raise Exception(f"Audio file not found: {audio_file_path}")
             
-            audio = AudioSegment.from_wav(audio_file_path)
+            samples, frame_rate, subtype = self._load_samples(audio_file_path)
             
-            if len(audio) == 0:
+            if len(samples) == 0:
                 raise Exception("Audio file is empty or corrupted")
             
             # Get base filename without extension
             base_name = os.path.splitext(os.path.basename(audio_file_path))[0]
             
             # Convert max duration to milliseconds
-            max_duration_ms = max_duration_seconds * 1000
+            # At least 1 ms, or every chunk would end where it starts
+            max_duration_ms = max(int(max_duration_seconds * 1000), 1)
             
             # Check if audio is shorter than or equal to the requested duration
-            audio_duration_ms = len(audio)
+            audio_duration_ms = len(samples) * 1000 // frame_rate
             if audio_duration_ms <= max_duration_ms:
                 # Audio is already shorter than requested duration, return as single chunk
-                chunks = [audio]
+                chunks = [(0, len(samples))]
             else:
                 # For longer audio, prioritize duration-based splitting to get chunks close to target duration
-                chunks = self._split_by_duration_and_silence(audio, max_duration_ms, 
+                chunks = self._split_by_duration_and_silence(samples, frame_rate, max_duration_ms,
                                                            min_silence_len, silence_thresh)
             
             # Ensure we have chunks to process
             if not chunks:
                 # If no chunks were created, create one chunk with the entire audio
-                chunks = [audio]
+                chunks = [(0, len(samples))]
             
-            # Save chunks
+            # Save chunks; each write is independent I/O, so run them concurrently
             output_files = []
-            for i, chunk in enumerate(chunks):
-                if len(chunk) > 0:  # Only save non-empty chunks
-                    output_filename = f"{base_name}_part_{i+1:03d}.wav"
-                    output_path = os.path.join(self.output_folder, output_filename)
+            with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as executor:
+                futures = []
+                for i, (chunk_start, chunk_end) in enumerate(chunks):
+                    if chunk_end > chunk_start:  # Only save non-empty chunks
+                        output_filename = f"{base_name}_part_{i+1:03d}.wav"
+                        output_path = os.path.join(output_folder or self.output_folder, output_filename)
+                        futures.append((i, output_path, executor.submit(
+                            self._write_samples, output_path,
+                            samples[chunk_start:chunk_end], frame_rate, subtype
+                        )))
+                
+                for i, output_path, future in futures:
                     try:
-                        chunk.export(output_path, format="wav")
+                        future.result()
                         output_files.append(output_path)
                     except Exception as export_error:
                         raise Exception(f"Failed to export chunk {i+1}: {str(export_error)}")
@@ -77,13 +153,22 @@ class AudioSplitter:
         except Exception as e:
             raise Exception(f"Error processing audio file: {str(e)}")
     
-    def _split_by_duration_and_silence(self, audio, max_duration_ms, min_silence_len, silence_thresh):
+    def _split_by_duration_and_silence(self, samples, frame_rate, max_duration_ms, min_silence_len, silence_thresh):
         """
         Split audio to get chunks as close as possible to max_duration_ms,
         preferring silence points near the target duration
+        
+        Returns:
+            List of (start_sample, end_sample) pairs
         """
         chunks = []
-        audio_length = len(audio)
+        audio_length = len(samples) * 1000 // frame_rate
+        
+        def to_sample(ms):
+            return ms * frame_rate // 1000
+        
+        # The silence structure never changes, so map it once for the whole file
+        silence_ranges = self._detect_silence_ranges(samples, frame_rate, min_silence_len, silence_thresh)
         
         start = 0
         while start < audio_length:
@@ -92,7 +177,7 @@ class AudioSplitter:
             
             # If this would be the last chunk, just take what's left
             if target_end >= audio_length:
-                chunks.append(audio[start:])
+                chunks.append((to_sample(start), len(samples)))
                 break
             
             # Define search window around target point (±2 seconds)
@@ -102,151 +187,257 @@ class AudioSplitter:
             
             # Find the best silence point in the search window
             best_split = self._find_best_silence_point_near_target(
-                audio[search_start:search_end], 
-                silence_thresh, 
-                min_silence_len,
-                target_end - search_start  # Target position within search segment
+                silence_ranges, target_end, search_start, search_end, min_silence_len
             )
             
             if best_split is not None:
-                actual_end = search_start + best_split
+                actual_end = best_split
             else:
                 # No silence found, split at target duration
                 actual_end = target_end
             
-            chunks.append(audio[start:actual_end])
+            chunks.append((to_sample(start), to_sample(actual_end)))
             start = actual_end
         
         return chunks
     
-    def _find_best_silence_point_near_target(self, audio_segment, silence_thresh, min_silence_len, target_position):
+    def _silence_mask(self, samples, frame_rate, window_ms, step_ms, silence_thresh):
         """
-        Find the best silence point closest to the target position within the audio segment
+        Flag every window_ms window starting at each step_ms position of the
+        samples whose level is below silence_thresh
         """
-        if len(audio_segment) < min_silence_len:
-            return None
+        # Silence detection only needs the level, so scan a ~8kHz copy
+        factor = max(frame_rate // SCAN_RATE, 1)
+        scan_samples = samples[::factor]
+        channels = scan_samples.shape[1]
+        
+        # 16 bits of level resolution is plenty for thresholds down to -80 dB,
+        # and keeps every square inside an int32
+        if scan_samples.dtype.kind == 'f':
+            # Float PCM is full scale at ±1.0; round rather than truncate so
+            # quiet passages are not pulled towards zero and read as silence
+            scan_samples = np.clip(np.rint(scan_samples * 32768), -32768, 32767).astype(np.int16)
+        elif scan_samples.dtype.itemsize > 2:
+            scan_samples = (scan_samples >> (8 * (scan_samples.dtype.itemsize - 2))).astype(np.int16)
+        
+        # Square each channel before combining them, so the level is the mean
+        # square over all samples like pydub's dBFS and out-of-phase channels
+        # cannot cancel out; frames keep the per-channel sum, the threshold
+        # is scaled by the channel count instead
+        sq = scan_samples.astype(np.int32)
+        sq *= sq
+        frame_sq = np.ascontiguousarray(sq[:, 0]) if channels == 1 else sq.sum(axis=1, dtype=np.int64)
+        
+        # The step is rarely a whole number of scan samples (e.g. 1102.5 at
+        # 22050 Hz), so round each window start from the exact ms position
+        # rather than accumulating a floored step across the file
+        window = window_ms * frame_rate // (1000 * factor)
+        step = step_ms * frame_rate / (1000 * factor)
+        if window <= 0 or step <= 0 or len(frame_sq) < window:
+            return np.zeros(0, dtype=bool)
         
-        # Find all silence ranges
-        silence_ranges = []
+        starts = np.round(np.arange(int((len(frame_sq) - window) // step) + 2) * step).astype(np.int64)
+        starts = starts[starts + window <= len(frame_sq)]
+        
+        # Compare mean squares against the threshold in linear units, skipping log10
+        max_sample = np.iinfo(scan_samples.dtype).max + 1
+        thresh_frame_sq = (10 ** (silence_thresh / 10.0)) * max_sample ** 2 * channels
+        if _scan_silence is not None:
+            return _scan_silence(frame_sq, starts, window, thresh_frame_sq)
+        
+        return self._mean_square_profile(frame_sq, starts, window) < thresh_frame_sq
+    
+    def _mean_square_profile(self, frame_sq, starts, window):
+        """
+        Compute the mean per-frame energy of the window-frame window beginning
+        at each of starts, in a single pass over the frame energies
+        """
+        # Running sum so every window energy is a single subtraction;
+        # only the running sum needs int64
+        csum = np.concatenate(([0], np.cumsum(frame_sq, dtype=np.int64)))
+        
+        return (csum[starts + window] - csum[starts]) / window
+    
+    def _detect_silence_ranges(self, samples, frame_rate, min_silence_len, silence_thresh):
+        """
+        Find every silence range in the audio as an (N, 2) array of
+        (start_ms, end_ms) rows, sorted and non-overlapping
+        """
         chunk_size = 100  # Check every 100ms
+        silent = self._silence_mask(samples, frame_rate, min_silence_len, chunk_size, silence_thresh)
         
-        for i in range(0, len(audio_segment) - min_silence_len, chunk_size):
-            chunk = audio_segment[i:i + min_silence_len]
-            try:
-                if chunk.dBFS < silence_thresh or chunk.dBFS == float('-inf'):
-                    # Found potential silence, extend it
-                    silence_start = i
-                    silence_end = i + min_silence_len
-                    
-                    # Extend backwards
-                    while silence_start > 0:
-                        test_chunk = audio_segment[silence_start - chunk_size:silence_start + min_silence_len]
-                        if len(test_chunk) >= min_silence_len and (test_chunk.dBFS < silence_thresh or test_chunk.dBFS == float('-inf')):
-                            silence_start -= chunk_size
-                        else:
-                            break
-                    
-                    # Extend forwards
-                    while silence_end < len(audio_segment) - min_silence_len:
-                        test_chunk = audio_segment[silence_end - min_silence_len:silence_end + chunk_size]
-                        if len(test_chunk) >= min_silence_len and (test_chunk.dBFS < silence_thresh or test_chunk.dBFS == float('-inf')):
-                            silence_end += chunk_size
-                        else:
-                            break
-                    
-                    # Avoid overlapping ranges
-                    if not any(silence_start < end and silence_end > start for start, end in silence_ranges):
-                        silence_ranges.append((silence_start, silence_end))
-            except:
+        # Contiguous runs of silent windows, as [first, last + 1) window indices
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+        run_starts, run_ends = edges[::2], edges[1::2]
+        
+        # Each run spans from its first window's start to its last window's end
+        return np.column_stack((
+            run_starts * chunk_size,
+            (run_ends - 1) * chunk_size + min_silence_len
+        )).astype(np.int64)
+    
+    def _find_best_silence_point_near_target(self, silence_ranges, target_position, search_start, search_end,
+                                             min_silence_len):
+        """
+        Pick the middle of the silence closest to the target position, with
+        each silence range clipped to [search_start, search_end] first, or
+        None if no range overlaps the window by at least min_silence_len
+        """
+        # Ranges are sorted and non-overlapping, so the overlapping ones are a contiguous slice
+        first = np.searchsorted(silence_ranges[:, 1], search_start, side='right')
+        last = np.searchsorted(silence_ranges[:, 0], search_end, side='left')
+        
+        best_split = None
+        for start, end in silence_ranges[first:last]:
+            start, end = max(start, search_start), min(end, search_end)
+            if end - start < min_silence_len:
                 continue
+            candidate = int((start + end) // 2)
+            if best_split is None or abs(candidate - target_position) < abs(best_split - target_position):
+                best_split = candidate
         
-        if not silence_ranges:
+        return best_split
+    
+    def _find_best_silence_point(self, samples, frame_rate, silence_thresh, min_silence_len):
+        """
+        Find the best silence point in the samples, i.e. the middle of the longest silence
+        """
+        silence_ranges = self._detect_silence_ranges(samples, frame_rate, min_silence_len, silence_thresh)
+        if len(silence_ranges) == 0:
             return None
         
-        # Find the silence point closest to target position
-        best_split = None
-        best_distance = float('inf')
+        longest = int(np.argmax(silence_ranges[:, 1] - silence_ranges[:, 0]))
+        return int(silence_ranges[longest].sum() // 2)
+    
+    def _load_samples(self, audio_file_path):
+        """
+        Load audio as a (frames, channels) array; integer for PCM, float for float WAVs
         
-        for start, end in silence_ranges:
-            # Use middle of silence range
-            silence_middle = (start + end) // 2
-            distance = abs(silence_middle - target_position)
-            
-            if distance < best_distance:
-                best_distance = distance
-                best_split = silence_middle
+        16 and 32-bit PCM WAV files are memory-mapped so the OS pages the
+        samples in on demand; other WAV files are read with soundfile, and
+        anything else (or a missing soundfile install) falls back to pydub.
         
-        return best_split
+        Returns:
+            Tuple of (samples, frame_rate, subtype)
+        """
+        mapped = self._memmap_wav(audio_file_path)
+        if mapped is not None:
+            return mapped
+        
+        if sf is not None and os.path.splitext(audio_file_path)[1].lower() == '.wav':
+            subtype = sf.info(audio_file_path).subtype
+            # libsndfile does not scale float files read as ints, so keep them as floats
+            if subtype in ('FLOAT', 'DOUBLE'):
+                dtype = 'float32' if subtype == 'FLOAT' else 'float64'
+            elif subtype in ('PCM_16', 'PCM_U8', 'PCM_S8'):
+                dtype = 'int16'
+            else:
+                dtype = 'int32'
+            samples, frame_rate = sf.read(audio_file_path, dtype=dtype, always_2d=True)
+            return samples, frame_rate, subtype
+        
+        audio = AudioSegment.from_file(audio_file_path)
+        audio = audio.set_sample_width(2 if audio.sample_width <= 2 else 4)
+        samples = np.array(audio.get_array_of_samples()).reshape(-1, audio.channels)
+        return samples, audio.frame_rate, f"PCM_{audio.sample_width * 8}"
     
-    def _find_best_silence_point(self, audio_segment, silence_thresh, min_silence_len):
-        """
-        Find the best silence point in an audio segment using pydub's built-in methods
-        """
-        # Use pydub's silence detection to find silence periods
-        silence_ranges = []
-        
-        # Split the segment into smaller chunks to analyze
-        chunk_length = min_silence_len  # Use minimum silence length as chunk size
-        
-        for i in range(0, len(audio_segment), chunk_length // 4):  # Overlap chunks
-            chunk_end = min(i + chunk_length, len(audio_segment))
-            chunk = audio_segment[i:chunk_end]
-            
-            # Check if this chunk is mostly silent
-            if len(chunk) >= min_silence_len:
-                try:
-                    # Use pydub's dBFS (decibels relative to full scale)
-                    chunk_db = chunk.dBFS
-                    # Handle -inf case (completely silent audio)
-                    if chunk_db == float('-inf') or chunk_db < silence_thresh:
-                        silence_ranges.append((i, chunk_end))
-                except:
-                    # If dBFS calculation fails, skip this chunk
-                    continue
-        
-        # Find the longest silence period
-        if silence_ranges:
-            # Merge overlapping ranges and find the longest
-            merged_ranges = []
-            current_start, current_end = silence_ranges[0]
-            
-            for start, end in silence_ranges[1:]:
-                if start <= current_end + min_silence_len // 2:  # Allow small gaps
-                    current_end = max(current_end, end)
-                else:
-                    merged_ranges.append((current_start, current_end))
-                    current_start, current_end = start, end
-            
-            merged_ranges.append((current_start, current_end))
-            
-            # Find the longest silence
-            longest_silence = max(merged_ranges, key=lambda x: x[1] - x[0])
-            
-            # Return the middle point of the longest silence
-            return (longest_silence[0] + longest_silence[1]) // 2
+    def _memmap_wav(self, audio_file_path):
+        """
+        Memory-map the PCM body of a 16 or 32-bit WAV file
         
-        return None
+        Returns:
+            Tuple of (samples, frame_rate, subtype), or None if the file
+            cannot be mapped directly
+        """
+        subtypes = {2: 'PCM_16', 4: 'PCM_32'}
+        try:
+            with open(audio_file_path, 'rb') as f:
+                with wave.open(f, 'rb') as w:
+                    frame_rate = w.getframerate()
+                    channels = w.getnchannels()
+                    sample_width = w.getsampwidth()
+                    n_frames = w.getnframes()
+                    # wave stops right after the data chunk header
+                    data_offset = f.tell()
+        except (wave.Error, EOFError):
+            return None
+        
+        if sample_width not in subtypes:
+            return None
+        
+        # Guard against truncated files or placeholder data sizes
+        frame_size = sample_width * channels
+        n_frames = min(n_frames, (os.path.getsize(audio_file_path) - data_offset) // frame_size)
+        dtype = np.dtype(f'<i{sample_width}')
+        if n_frames <= 0:
+            return np.empty((0, channels), dtype=dtype), frame_rate, subtypes[sample_width]
+        
+        samples = np.memmap(audio_file_path, dtype=dtype, mode='r',
+                            offset=data_offset, shape=(n_frames, channels))
+        return samples, frame_rate, subtypes[sample_width]
     
-    def get_audio_info(self, audio_file_path):
+    def _write_samples(self, output_path, samples, frame_rate, subtype):
         """
-        Get basic information about the audio file
+        Write a (frames, channels) sample array to a WAV file
+        """
+        if sf is not None:
+            sf.write(output_path, samples, frame_rate, subtype=subtype)
+        else:
+            AudioSegment(
+                data=samples.tobytes(),
+                sample_width=samples.dtype.itemsize,
+                frame_rate=frame_rate,
+                channels=samples.shape[1]
+            ).export(output_path, format="wav")
+    
+    def get_audio_info(self, audio_file):
+        """
+        Get basic information about the audio file from its WAV header alone
+        
+        soundfile is preferred because the wave module rejects
+        WAVE_FORMAT_EXTENSIBLE and IEEE float files.
+        
+        Args:
+            audio_file: Path or binary file object of a WAV file
         """
         try:
-            audio = AudioSegment.from_wav(audio_file_path)
-            return {
-                'duration_seconds': len(audio) / 1000,
-                'channels': audio.channels,
-                'frame_rate': audio.frame_rate,
-                'sample_width': audio.sample_width
-            }
+            if sf is not None:
+                info = sf.info(audio_file)
+                return {
+                    'duration_seconds': info.frames / info.samplerate,
+                    'channels': info.channels,
+                    'frame_rate': info.samplerate,
+                    'sample_width': SUBTYPE_SAMPLE_WIDTHS.get(info.subtype, 2)
+                }
+            
+            with wave.open(audio_file, 'rb') as w:
+                return {
+                    'duration_seconds': w.getnframes() / w.getframerate(),
+                    'channels': w.getnchannels(),
+                    'frame_rate': w.getframerate(),
+                    'sample_width': w.getsampwidth()
+                }
         except Exception as e:
             raise Exception(f"Error reading audio file info: {str(e)}")
     
+    def get_job_output_folder(self, job_id):
+        """
+        Get the folder holding one job's split files
+        """
+        return os.path.join(self.output_folder, job_id)
+    
+    def clear_job_output_folder(self, job_id):
+        """
+        Empty (or create) one job's output folder, leaving other jobs' files alone
+        """
+        job_folder = self.get_job_output_folder(job_id)
+        shutil.rmtree(job_folder, ignore_errors=True)
+        os.makedirs(job_folder, exist_ok=True)
+        return job_folder
+    
     def clear_output_folder(self):
         """
         Clear all files in the output folder
         """
-        for filename in os.listdir(self.output_folder):
-            file_path = os.path.join(self.output_folder, filename)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
\ No newline at end of file
+        shutil.rmtree(self.output_folder, ignore_errors=True)
+        os.makedirs(self.output_folder, exist_ok=True)
\ No newline at end of file
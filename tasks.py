@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import shutil
+import redis
+from celery import Celery
+from audio_splitter import AudioSplitter
+
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+JOB_TTL_SECONDS = 24 * 60 * 60  # Jobs expire after a day instead of piling up
+
+celery_app = Celery('wavslicer', broker=REDIS_URL)
+celery_app.conf.task_routes = {'tasks.split_task': {'queue': 'splitting'}}
+
+# Files outlive their Redis record, so sweep them up once the record has expired
+celery_app.conf.beat_schedule = {
+    'cleanup-expired-jobs': {
+        'task': 'tasks.cleanup_expired_jobs',
+        'schedule': 60 * 60,
+        'options': {'queue': 'splitting'},
+    },
+}
+
+# Job state lives in Redis so the web app and every worker process see the same jobs
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+splitter = AudioSplitter()
+
+def get_job(job_id):
+    data = redis_client.get(f'job:{job_id}')
+    return json.loads(data) if data is not None else None
+
+def save_job(job_id, job):
+    redis_client.set(f'job:{job_id}', json.dumps(job), ex=JOB_TTL_SECONDS)
+
+def clear_jobs():
+    # SCAN walks the keyspace incrementally instead of blocking Redis like KEYS
+    for key in redis_client.scan_iter(match='job:*'):
+        redis_client.delete(key)
+
+@celery_app.task
+def split_task(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return
+
+    # Process the audio file
+    try:
+        # Update status
+        job['status'] = 'processing'
+        save_job(job_id, job)
+
+        # Each job writes to its own folder so concurrent workers never touch each other's files
+        job_folder = splitter.clear_job_output_folder(job_id)
+
+        output_files = splitter.detect_silence_and_split(
+            job['filepath'],
+            job['parameters']['max_duration'],
+            job['parameters']['min_silence_len'],
+            job['parameters']['silence_thresh'],
+            output_folder=job_folder
+        )
+
+        job['output_files'] = [os.path.basename(f) for f in output_files]
+        job['status'] = 'completed'
+
+    except Exception as e:
+        job['status'] = 'error'
+        job['error'] = str(e)
+
+    finally:
+        # The upload is not needed once the split has finished either way
+        if os.path.exists(job['filepath']):
+            os.remove(job['filepath'])
+
+    save_job(job_id, job)
+
+@celery_app.task
+def cleanup_expired_jobs():
+    """
+    Remove uploads and job output folders left behind by expired jobs
+    """
+    cutoff = time.time() - JOB_TTL_SECONDS
+
+    # Uploads that were never processed are only referenced by their job record
+    with os.scandir(splitter.input_folder) as entries:
+        for entry in entries:
+            if entry.is_file() and not entry.name.startswith('.') and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+    with os.scandir(splitter.output_folder) as entries:
+        for entry in entries:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff and get_job(entry.name) is None:
+                shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,102 @@
+import io
+import os
+import time
+import zipfile
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import app as app_module
+import tasks
+from audio_splitter import AudioSplitter
+
+
+def wav_bytes(format='WAV', subtype='PCM_16', seconds=3, frame_rate=16000):
+    samples = np.random.default_rng(0).normal(0, 3000, (frame_rate * seconds, 2)).astype(np.int16)
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, frame_rate, format=format, subtype=subtype)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def splitter(tmp_path, monkeypatch, fake_redis):
+    splitter = AudioSplitter(str(tmp_path / 'input'), str(tmp_path / 'output'))
+    monkeypatch.setattr(app_module, 'splitter', splitter)
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', splitter.input_folder)
+    monkeypatch.setitem(app_module.app.config, 'OUTPUT_FOLDER', splitter.output_folder)
+    return splitter
+
+
+@pytest.fixture
+def client(splitter):
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('job_id', ['..', '%2E%2E'])
+def test_download_rejects_parent_directory_job_id(client, splitter, job_id):
+    # A file sitting next to the output folder must not be reachable via a '..' job id
+    secret = os.path.join(os.path.dirname(splitter.output_folder), 'secret.txt')
+    with open(secret, 'w') as f:
+        f.write('source code')
+
+    assert client.get(f'/download/{job_id}/secret.txt').status_code == 404
+
+
+def test_download_rejects_files_the_job_did_not_produce(client, splitter):
+    tasks.save_job('job', {'status': 'completed', 'output_files': ['a.wav']})
+    job_folder = splitter.clear_job_output_folder('job')
+    with open(os.path.join(job_folder, 'other.wav'), 'wb') as f:
+        f.write(b'RIFF')
+
+    assert client.get('/download/job/other.wav').status_code == 404
+
+
+@pytest.mark.parametrize('max_duration', ['0', '0.0005', '0.5', '3601'])
+def test_upload_rejects_out_of_range_duration(client, max_duration):
+    response = client.post('/upload', data={
+        'file': (wav_bytes(), 'clip.wav'),
+        'max_duration': max_duration,
+    })
+
+    assert response.status_code == 400
+
+
+def test_upload_rejects_non_riff_file_with_wav_extension(client):
+    response = client.post('/upload', data={'file': (io.BytesIO(b'ID3\x04' + bytes(64)), 'clip.wav')})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Not a WAV file'
+
+
+def test_upload_accepts_wave_extensible(client, splitter):
+    response = client.post('/upload', data={'file': (wav_bytes(format='WAVEX'), 'clip.wav')})
+
+    assert response.status_code == 200
+    job = tasks.get_job(response.get_json()['job_id'])
+    assert job['audio_info']['channels'] == 2
+    assert os.path.exists(job['filepath'])
+
+
+def test_download_all_streams_a_valid_zip_with_original_mtimes(client, splitter):
+    tasks.save_job('job', {'status': 'completed', 'output_files': ['a.wav', 'b.wav']})
+    job_folder = splitter.clear_job_output_folder('job')
+    # Zip timestamps have two-second resolution, so use an even second
+    mtime = time.mktime((2020, 1, 2, 3, 4, 6, 0, 0, -1))
+    for filename in ('a.wav', 'b.wav'):
+        path = os.path.join(job_folder, filename)
+        with open(path, 'wb') as f:
+            f.write(wav_bytes().getvalue())
+        os.utime(path, (mtime, mtime))
+
+    response = client.get('/download_all/job')
+
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.data)) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == ['a.wav', 'b.wav']
+        for zinfo in zipf.infolist():
+            assert zinfo.date_time == time.localtime(mtime)[:6]
+            with open(os.path.join(job_folder, zinfo.filename), 'rb') as f:
+                assert zipf.read(zinfo) == f.read()
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+import audio_splitter
+from audio_splitter import AudioSplitter
+
+
+@pytest.fixture(params=['numba', 'numpy'])
+def splitter(request, tmp_path, monkeypatch):
+    if request.param == 'numpy':
+        monkeypatch.setattr(audio_splitter, '_scan_silence', None)
+    elif audio_splitter._scan_silence is None:
+        pytest.skip('numba not installed')
+    return AudioSplitter(str(tmp_path / 'input'), str(tmp_path / 'output'))
+
+
+@pytest.mark.parametrize('frame_rate', [22050, 88200])
+def test_silence_ranges_do_not_drift_at_odd_scan_rates(splitter, frame_rate):
+    # Step is not a whole number of scan samples at these rates; a floored
+    # step used to push late silences several hundred ms off
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 3000, (frame_rate * 600, 1)).astype(np.int16)
+    samples[597 * frame_rate:598 * frame_rate] = 0
+
+    ranges = splitter._detect_silence_ranges(samples, frame_rate, 1000, -40)
+
+    assert ranges.tolist() == [[597000, 598000]]
+
+
+def test_anti_phase_stereo_is_not_silence(splitter):
+    # Averaging the channels before squaring would cancel R = -L to zero
+    frame_rate = 16000
+    left = np.random.default_rng(0).normal(0, 3000, frame_rate * 30).astype(np.int16)
+    samples = np.column_stack((left, -left))
+
+    ranges = splitter._detect_silence_ranges(samples, frame_rate, 1000, -40)
+
+    assert ranges.tolist() == []
+
+
+def test_stereo_level_is_mean_square_over_all_samples(splitter):
+    # One silent channel and one at -34 dBFS is -37 dBFS overall, like pydub's dBFS
+    frame_rate = 16000
+    amplitude = 32768 * 10 ** (-34 / 20)
+    left = np.random.default_rng(0).normal(0, amplitude, frame_rate * 10).astype(np.int16)
+    samples = np.column_stack((left, np.zeros_like(left)))
+
+    assert splitter._detect_silence_ranges(samples, frame_rate, 1000, -36).tolist() == [[0, 10000]]
+    assert splitter._detect_silence_ranges(samples, frame_rate, 1000, -38).tolist() == []
+
+
+def test_split_uses_long_silence_whose_middle_is_outside_search_window(splitter):
+    # Silence at 45-59 s has its middle at 52 s, well before the 58-62 s
+    # window around a 60 s target; the cut must still land inside it
+    frame_rate = 16000
+    samples = np.random.default_rng(0).normal(0, 3000, (frame_rate * 100, 1)).astype(np.int16)
+    samples[45 * frame_rate:59 * frame_rate] = 0
+
+    chunks = splitter._split_by_duration_and_silence(samples, frame_rate, 60000, 1000, -40)
+
+    assert chunks[0] == (0, int(58.5 * frame_rate))
+
+
+def test_sub_millisecond_max_duration_terminates(splitter, tmp_path):
+    # Rounds to 0 ms, which used to make every chunk end where it started
+    frame_rate = 16000
+    samples = np.random.default_rng(0).normal(0, 3000, (frame_rate // 50, 1)).astype(np.int16)
+    path = str(tmp_path / 'short.wav')
+    sf.write(path, samples, frame_rate, subtype='PCM_16')
+
+    output_files = splitter.detect_silence_and_split(path, 0.0005)
+
+    assert len(output_files) == 20
+
+
+@pytest.mark.parametrize('level_db', [-78.0, -79.5])
+def test_quiet_float_audio_above_threshold_is_not_silence(splitter, level_db):
+    # Truncating floats to int16 used to read these about 1 dB low
+    frame_rate = 16000
+    amplitude = 10 ** (level_db / 20)
+    samples = np.random.default_rng(0).normal(0, amplitude, (frame_rate * 10, 1)).astype(np.float32)
+
+    assert splitter._detect_silence_ranges(samples, frame_rate, 1000, -80).tolist() == []
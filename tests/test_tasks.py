@@ -0,0 +1,61 @@
+import os
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import tasks
+from audio_splitter import AudioSplitter
+
+
+@pytest.fixture
+def splitter(tmp_path, monkeypatch, fake_redis):
+    splitter = AudioSplitter(str(tmp_path / 'input'), str(tmp_path / 'output'))
+    monkeypatch.setattr(tasks, 'splitter', splitter)
+    return splitter
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_split_task_writes_job_folder_and_removes_upload(splitter):
+    filepath = os.path.join(splitter.input_folder, 'clip.wav')
+    samples = np.random.default_rng(0).normal(0, 3000, (16000 * 3, 1)).astype(np.int16)
+    sf.write(filepath, samples, 16000, subtype='PCM_16')
+    tasks.save_job('job', {
+        'status': 'queued',
+        'filepath': filepath,
+        'parameters': {'max_duration': 1, 'min_silence_len': 1000, 'silence_thresh': -40},
+        'output_files': [],
+        'error': None
+    })
+
+    tasks.split_task('job')
+
+    job = tasks.get_job('job')
+    assert job['status'] == 'completed'
+    assert sorted(os.listdir(splitter.get_job_output_folder('job'))) == job['output_files']
+    assert not os.path.exists(filepath)
+
+
+def test_cleanup_removes_only_expired_job_files(splitter):
+    old_upload = os.path.join(splitter.input_folder, 'old.wav')
+    new_upload = os.path.join(splitter.input_folder, 'new.wav')
+    for path in (old_upload, new_upload):
+        open(path, 'wb').close()
+    age(old_upload, tasks.JOB_TTL_SECONDS + 60)
+
+    expired = splitter.clear_job_output_folder('expired')
+    live = splitter.clear_job_output_folder('live')
+    recent = splitter.clear_job_output_folder('recent')
+    tasks.save_job('live', {'status': 'completed'})
+    age(expired, tasks.JOB_TTL_SECONDS + 60)
+    age(live, tasks.JOB_TTL_SECONDS + 60)
+
+    tasks.cleanup_expired_jobs()
+
+    assert os.listdir(splitter.input_folder) == ['new.wav']
+    assert sorted(os.listdir(splitter.output_folder)) == ['live', 'recent']